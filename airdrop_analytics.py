@@ -0,0 +1,214 @@
+"""Portfolio analytics maintained incrementally.
+
+PortfolioAnalytics keeps one parsed row per airdrop, aligned with the list in
+st.session_state.airdrops, plus running aggregates over those rows. Adds,
+edits and deletes adjust the aggregates by the entry's own contribution, so
+the sidebar no longer rebuilds a DataFrame on every rerun and the free-text
+`Amount Invested` is parsed into US dollars once per entry.
+"""
+import re
+from collections import Counter
+from datetime import datetime, date
+
+import streamlit as st
+
+from airdrop_backend import get_sheets_service, row_to_airdrop
+
+# One number with whatever marks its currency: "$1,200.50", "-$100", "10k USDC",
+# "USDT 500", "~$2M". A k/M only counts as a multiplier when no letter follows
+# it, so the "M" of "500 MATIC" is read as the start of a ticker.
+_AMOUNT_PATTERN = re.compile(
+    r'(?:\b(USD[CT]?)\s*)?(-)?\s*(\$)?\s*(\d+(?:\.\d+)?)(?!\d)'
+    r'(?:\s*([km])(?![a-z]))?(?:\s*([a-z]+))?',
+    re.IGNORECASE
+)
+# A number on its own, "500" or "1.5k", is taken as dollars like the form asks for
+_BARE_AMOUNT_PATTERN = re.compile(r'~?\s*(-)?\s*(\d+(?:\.\d+)?)\s*([km])?', re.IGNORECASE)
+_USD_CURRENCIES = {'USD', 'USDC', 'USDT'}
+_AMOUNT_MULTIPLIERS = {'k': 1_000, 'm': 1_000_000}
+
+
+def _amount_value(sign, number, suffix):
+    value = float(number) * (_AMOUNT_MULTIPLIERS[suffix.lower()] if suffix else 1)
+    return -value if sign else value
+
+
+def _parse_usd(part):
+    """The single USD amount in one term of an amount, or None"""
+    values = []
+    for prefix, sign, dollar, number, suffix, word in _AMOUNT_PATTERN.findall(part):
+        if prefix or dollar or word.upper() in _USD_CURRENCIES:
+            values.append(_amount_value(sign, number, suffix))
+    if len(values) == 1:
+        return values[0]
+    bare = _BARE_AMOUNT_PATTERN.fullmatch(part.strip())
+    if not values and bare:
+        return _amount_value(*bare.groups())
+    return None
+
+
+def parse_amount(text):
+    """Parse a free-text investment amount into US dollars.
+
+    Only dollar and USD stablecoin amounts count; "2 ETH", "3 months" or two
+    unrelated dollar figures give None. Terms joined by "+" are added up.
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    total = 0.0
+    for part in str(text).replace(',', '').split('+'):
+        value = _parse_usd(part)
+        if value is None:
+            return None
+        total += value
+    return total
+
+
+def _parse_date(text):
+    try:
+        return datetime.strptime(str(text), '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+class PortfolioAnalytics:
+    """Running aggregates over a list of airdrop entries.
+
+    The methods mirror the list operations the app performs, by position:
+    add() after append, replace(idx, ...) after assignment, remove(idx)
+    after pop. Each one costs O(1) regardless of portfolio size.
+    """
+
+    def __init__(self, airdrops=(), keep_rows=True):
+        # Without rows only add() is available, which is all a one-off report needs
+        self.keep_rows = keep_rows
+        self.rows = []
+        self.status_counts = Counter()
+        self.tx_by_status = Counter()
+        self.invested_by_status = Counter()
+        self.invested_by_protocol = Counter()
+        self.invested_by_month = Counter()
+        self.activity_dates = Counter()
+        self.unparsed_amounts = 0
+        for airdrop in airdrops:
+            self.add(airdrop)
+
+    @staticmethod
+    def _parse(airdrop):
+        """The numeric row for one entry: everything the aggregates need"""
+        try:
+            tx_count = int(airdrop.get('TX Count') or 0)
+        except (TypeError, ValueError):
+            tx_count = 0
+        raw_amount = str(airdrop.get('Amount Invested', '') or '').strip()
+        amount = parse_amount(raw_amount) if raw_amount else None
+        last_activity = _parse_date(airdrop.get('Last Activity'))
+        return {
+            'status': airdrop.get('Status', 'Active') or 'Active',
+            'protocol': airdrop.get('Protocol Name', '') or 'Unknown',
+            'tx_count': tx_count,
+            'amount': amount,
+            'unparsed': bool(raw_amount) and amount is None,
+            'last_activity': last_activity,
+        }
+
+    @staticmethod
+    def _bump(counter, key, delta):
+        counter[key] += delta
+        # Drop keys that fell back to zero so breakdowns only list live entries
+        if abs(counter[key]) < 1e-9:
+            del counter[key]
+
+    def _apply(self, row, sign):
+        self._bump(self.status_counts, row['status'], sign)
+        self.tx_by_status[row['status']] += sign * row['tx_count']
+        if row['amount'] is not None:
+            self._bump(self.invested_by_status, row['status'], sign * row['amount'])
+            self._bump(self.invested_by_protocol, row['protocol'], sign * row['amount'])
+            if row['last_activity']:
+                self._bump(self.invested_by_month, row['last_activity'].strftime('%Y-%m'), sign * row['amount'])
+        self.unparsed_amounts += sign * row['unparsed']
+        if row['last_activity']:
+            self._bump(self.activity_dates, row['last_activity'], sign)
+
+    def add(self, airdrop):
+        row = self._parse(airdrop)
+        if self.keep_rows:
+            self.rows.append(row)
+        self._apply(row, 1)
+
+    def replace(self, idx, airdrop):
+        self._apply(self.rows[idx], -1)
+        self.rows[idx] = self._parse(airdrop)
+        self._apply(self.rows[idx], 1)
+
+    def remove(self, idx):
+        self._apply(self.rows.pop(idx), -1)
+
+    @property
+    def total(self):
+        return sum(self.status_counts.values())
+
+    @property
+    def total_tx(self):
+        return sum(self.tx_by_status.values())
+
+    @property
+    def total_invested(self):
+        return sum(self.invested_by_status.values())
+
+    def amounts(self):
+        """The parsed `Amount Invested` column, in portfolio order"""
+        return [row['amount'] for row in self.rows]
+
+    def recency(self, today=None):
+        """Days since the latest activity and how many entries saw activity in the last 7 and 30 days"""
+        today = today or date.today()
+        if not self.activity_dates:
+            return {'days_since_last': None, 'active_7d': 0, 'active_30d': 0}
+        latest = max(self.activity_dates)
+        return {
+            'days_since_last': (today - latest).days,
+            'active_7d': sum(n for d, n in self.activity_dates.items() if 0 <= (today - d).days <= 7),
+            'active_30d': sum(n for d, n in self.activity_dates.items() if 0 <= (today - d).days <= 30),
+        }
+
+
+def compute_sheet_analytics(chunk_size=5000):
+    """Cross-user aggregates from one streaming pass over the UserData sheet.
+
+    Rows are read in chunks of `chunk_size` and folded into a single
+    PortfolioAnalytics, so memory stays bounded by the chunk and the number
+    of distinct protocols, months and users. Wallets are never decrypted.
+    Returns (analytics, user_last_activity) or (None, None) without a connection.
+    """
+    service = get_sheets_service()
+    if not service:
+        return None, None
+    sheet_id = st.secrets["sheet_id"]
+    analytics = PortfolioAnalytics(keep_rows=False)
+    user_last_activity = {}
+    start_row = 2
+    while True:
+        end_row = start_row + chunk_size - 1
+        result = service.spreadsheets().values().get(
+            spreadsheetId=sheet_id,
+            range=f"UserData!A{start_row}:K{end_row}"
+        ).execute()
+        values = result.get('values', [])
+        for row in values:
+            if len(row) < 2 or not row[0]:
+                continue
+            analytics.add(row_to_airdrop(row))
+            last_activity = _parse_date(row[9] if len(row) > 9 else '')
+            current = user_last_activity.get(row[0])
+            if last_activity and (current is None or last_activity > current):
+                user_last_activity[row[0]] = last_activity
+            else:
+                user_last_activity.setdefault(row[0], current)
+        if len(values) < chunk_size:
+            break
+        start_row = end_row + 1
+    return analytics, user_last_activity
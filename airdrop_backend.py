@@ -0,0 +1,412 @@
+import streamlit as st
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+from datetime import datetime, date
+import smtplib
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+import hashlib
+import random
+import string
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
+import base64
+
+# Google Sheets connection
+def get_sheets_service():
+    try:
+        creds_dict = dict(st.secrets["gcp_service_account"])
+        if 'private_key' in creds_dict:
+            creds_dict['private_key'] = creds_dict['private_key'].replace('\\n', '\n')
+        credentials = service_account.Credentials.from_service_account_info(
+            creds_dict,
+            scopes=["https://www.googleapis.com/auth/spreadsheets"]
+        )
+        service = build('sheets', 'v4', credentials=credentials)
+        return service
+    except Exception as e:
+        st.error(f"Error connecting to Google Sheets: {e}")
+        import traceback
+        st.error(traceback.format_exc())
+        return None
+
+def get_calendar_service():
+    try:
+        creds_dict = dict(st.secrets["gcp_service_account"])
+        if 'private_key' in creds_dict:
+            creds_dict['private_key'] = creds_dict['private_key'].replace('\\n', '\n')
+        credentials = service_account.Credentials.from_service_account_info(
+            creds_dict,
+            scopes=["https://www.googleapis.com/auth/calendar"]
+        )
+        service = build('calendar', 'v3', credentials=credentials)
+        return service
+    except Exception as e:
+        st.error(f"Error connecting to Google Calendar: {e}")
+        return None
+
+def generate_user_id(email):
+    return hashlib.md5(email.lower().encode()).hexdigest()[:12]
+
+def generate_verification_code():
+    return ''.join(random.choices(string.digits, k=6))
+
+def derive_fernet(secret):
+    """Create a Fernet instance from a plain-text secret"""
+    key = base64.urlsafe_b64encode(hashlib.sha256(secret.encode()).digest())
+    return Fernet(key)
+
+def get_encryption_secrets():
+    """Current encryption secret first, followed by any retired ones still accepted for decryption"""
+    # Use a secret key from Streamlit secrets
+    current = st.secrets.get("encryption_key", "default-secret-key-change-this")
+    previous = st.secrets.get("previous_encryption_keys", [])
+    if isinstance(previous, str):
+        previous = [previous]
+    return [current] + [secret for secret in previous if secret and secret != current]
+
+def get_encryption_key(secrets=None):
+    """Get encryption key from secrets.
+
+    Returns a MultiFernet: new values are encrypted with `encryption_key`,
+    while values written under any of `previous_encryption_keys` still
+    decrypt until they have been rotated (see rotate_encryption_key.py).
+    """
+    try:
+        if secrets is None:
+            secrets = get_encryption_secrets()
+        return MultiFernet([derive_fernet(secret) for secret in secrets])
+    except Exception as e:
+        st.error(f"Encryption error: {e}")
+        return None
+
+def is_encrypted_wallet(value):
+    """Check whether a stored wallet value has the shape of an encrypted token"""
+    try:
+        token = base64.urlsafe_b64decode(value.encode())
+        raw = base64.urlsafe_b64decode(token)
+    except Exception:
+        return False
+    # Fernet tokens start with version byte 0x80 and carry at least one cipher block
+    return len(raw) >= 73 and raw[0] == 0x80
+
+def encrypt_wallet(wallet_address, fernet=None):
+    """Encrypt wallet address.
+
+    A value that is already a token is returned unchanged: it is a wallet
+    no configured key could decrypt on load, and wrapping it in another
+    layer would hide it from key rotation while it stays unreadable.
+    """
+    if not wallet_address:
+        return ""
+    if is_encrypted_wallet(wallet_address):
+        return wallet_address
+    try:
+        fernet = fernet or get_encryption_key()
+        if fernet:
+            encrypted = fernet.encrypt(wallet_address.encode())
+            return base64.urlsafe_b64encode(encrypted).decode()
+        return wallet_address
+    except:
+        return wallet_address
+
+def decrypt_wallet(encrypted_wallet, fernet=None):
+    """Decrypt wallet address.
+
+    Raises InvalidToken when the value is encrypted but none of the
+    configured keys can open it.
+    """
+    if not encrypted_wallet:
+        return ""
+    # Rows written before encryption was introduced are stored as plain text
+    if not is_encrypted_wallet(encrypted_wallet):
+        return encrypted_wallet
+    fernet = fernet or get_encryption_key()
+    if not fernet:
+        return encrypted_wallet
+    decoded = base64.urlsafe_b64decode(encrypted_wallet.encode())
+    return fernet.decrypt(decoded).decode()
+
+def rotate_wallet(stored_wallet, fernet):
+    """Re-encrypt a stored wallet value under the current key.
+
+    Returns a (status, value) tuple where status is one of 'empty',
+    'rotated', 'encrypted' (legacy plain text) or 'failed' (token that
+    none of the keys can open; left untouched).
+    """
+    if not stored_wallet:
+        return 'empty', stored_wallet
+    if not is_encrypted_wallet(stored_wallet):
+        return 'encrypted', encrypt_wallet(stored_wallet, fernet)
+    try:
+        decoded = base64.urlsafe_b64decode(stored_wallet.encode())
+        rotated = fernet.rotate(decoded)
+        return 'rotated', base64.urlsafe_b64encode(rotated).decode()
+    except InvalidToken:
+        return 'failed', stored_wallet
+
+def send_verification_email(to_email, code):
+    try:
+        from_email = st.secrets.get("alert_email", "")
+        password = st.secrets.get("alert_email_password", "")
+        if not from_email or not password:
+            return False, "Email credentials not configured"
+        msg = MIMEMultipart()
+        msg['From'] = from_email
+        msg['To'] = to_email
+        msg['Subject'] = "Your Airdrop Tracker Verification Code"
+        body = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif;">
+            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; text-align: center;">
+                <h1 style="color: white;">🪂 Airdrop Tracker</h1>
+            </div>
+            <div style="padding: 30px;">
+                <h2>Your Verification Code</h2>
+                <p>Enter this code to access your personal airdrop tracker:</p>
+                <div style="background-color: #f0f0f0; padding: 20px; text-align: center; font-size: 32px; font-weight: bold; letter-spacing: 5px; margin: 20px 0;">
+                    {code}
+                </div>
+                <p>This code is valid for 10 minutes.</p>
+            </div>
+        </body>
+        </html>
+        """
+        msg.attach(MIMEText(body, 'html'))
+        server = smtplib.SMTP('smtp.gmail.com', 587)
+        server.starttls()
+        server.login(from_email, password)
+        server.send_message(msg)
+        server.quit()
+        return True, "Verification code sent!"
+    except Exception as e:
+        return False, f"Error sending email: {str(e)}"
+
+def row_to_airdrop(row):
+    """Build an airdrop entry from a UserData row (wallet left encrypted)"""
+    return {
+        'Protocol Name': row[1] if len(row) > 1 else '',
+        'Status': row[2] if len(row) > 2 else 'Active',
+        'Expected Date': row[3] if len(row) > 3 else '',
+        'Ref Link': row[4] if len(row) > 4 else '',
+        'Tasks Completed': row[5] if len(row) > 5 else '',
+        'Wallet Used': row[6] if len(row) > 6 else '',
+        'TX Count': int(row[7]) if len(row) > 7 and row[7] and str(row[7]).replace('-','').isdigit() else 0,
+        'Amount Invested': row[8] if len(row) > 8 else '',
+        'Last Activity': row[9] if len(row) > 9 else '',
+        'Notes': row[10] if len(row) > 10 else ''
+    }
+
+def read_user_data(user_id, service=None):
+    """Read a user's entries, raising if the sheet can't be read.
+
+    Unlike load_user_data this never turns a failure into an empty
+    portfolio, so callers that write back can't save over real data.
+    """
+    service = service or get_sheets_service()
+    if not service:
+        raise ConnectionError("Could not connect to Google Sheets")
+    sheet_id = st.secrets["sheet_id"]
+    result = service.spreadsheets().values().get(
+        spreadsheetId=sheet_id,
+        range="UserData!A:K"
+    ).execute()
+    values = result.get('values', [])
+    if not values or len(values) < 2:
+        return []
+    user_data = []
+    fernet = get_encryption_key()
+    undecryptable = 0
+    for row in values[1:]:
+        if len(row) > 0:
+            row_user_id = row[0] if len(row) > 0 else ""
+            if row_user_id == user_id and len(row) >= 2:
+                airdrop = row_to_airdrop(row)
+                try:
+                    airdrop['Wallet Used'] = decrypt_wallet(airdrop['Wallet Used'], fernet)
+                except InvalidToken:
+                    # Keep the stored token; save_user_data writes it back as is
+                    undecryptable += 1
+                user_data.append(airdrop)
+    if undecryptable:
+        st.warning(f"{undecryptable} wallet address(es) could not be decrypted with the configured encryption keys. "
+                   "If the key was changed, list the old one under previous_encryption_keys.")
+    return user_data
+
+def load_user_data(user_id):
+    try:
+        service = get_sheets_service()
+        if not service:
+            return []
+        sheet_id = st.secrets["sheet_id"]
+        try:
+            result = service.spreadsheets().values().get(
+                spreadsheetId=sheet_id,
+                range="UserData!A1:K1"
+            ).execute()
+        except:
+            header = [['User ID', 'Protocol Name', 'Status', 'Expected Date', 'Ref Link', 
+                      'Tasks Completed', 'Wallet Used', 'TX Count', 'Amount Invested', 'Last Activity', 'Notes']]
+            service.spreadsheets().values().update(
+                spreadsheetId=sheet_id,
+                range="UserData!A1",
+                valueInputOption="RAW",
+                body={'values': header}
+            ).execute()
+            return []
+        return read_user_data(user_id, service)
+    except Exception as e:
+        st.error(f"Error loading user data: {e}")
+        return []
+
+def save_user_data(user_id, data):
+    try:
+        service = get_sheets_service()
+        if not service:
+            return False
+        sheet_id = st.secrets["sheet_id"]
+        try:
+            result = service.spreadsheets().values().get(
+                spreadsheetId=sheet_id,
+                range="UserData!A:K"
+            ).execute()
+            existing_values = result.get('values', [])
+        except:
+            existing_values = []
+        if not existing_values:
+            filtered_values = [['User ID', 'Protocol Name', 'Status', 'Expected Date', 'Ref Link', 
+                              'Tasks Completed', 'Wallet Used', 'TX Count', 'Amount Invested', 'Last Activity', 'Notes']]
+        else:
+            filtered_values = [existing_values[0]]
+            for row in existing_values[1:]:
+                if len(row) > 0 and row[0] != user_id:
+                    filtered_values.append(row)
+        for item in data:
+            filtered_values.append([
+                user_id,
+                str(item.get('Protocol Name', '')),
+                str(item.get('Status', 'Active')),
+                str(item.get('Expected Date', '')),
+                str(item.get('Ref Link', '')),
+                str(item.get('Tasks Completed', '')),
+                encrypt_wallet(str(item.get('Wallet Used', ''))),
+                str(item.get('TX Count', 0)),
+                str(item.get('Amount Invested', '')),
+                str(item.get('Last Activity', '')),
+                str(item.get('Notes', ''))
+            ])
+        body = {'values': filtered_values}
+        service.spreadsheets().values().clear(
+            spreadsheetId=sheet_id,
+            range="UserData!A:K"
+        ).execute()
+        service.spreadsheets().values().update(
+            spreadsheetId=sheet_id,
+            range="UserData!A1",
+            valueInputOption="RAW",
+            body=body
+        ).execute()
+        return True
+    except Exception as e:
+        st.error(f"Error saving user data: {str(e)}")
+        return False
+
+def add_to_calendar(protocol_name, expected_date, ref_link, user_email):
+    try:
+        service = get_calendar_service()
+        if not service:
+            return False, "Could not connect to Google Calendar"
+        if isinstance(expected_date, str):
+            event_date = datetime.strptime(expected_date, '%Y-%m-%d')
+        else:
+            event_date = expected_date
+        event = {
+            'summary': f'🪂 {protocol_name} Airdrop',
+            'description': f'Airdrop claim day for {protocol_name}\n\nReferral Link: {ref_link}\n\nUser: {user_email}\n\nAdded via Airdrop Tracker',
+            'start': {
+                'date': event_date.strftime('%Y-%m-%d'),
+                'timeZone': 'America/New_York',
+            },
+            'end': {
+                'date': event_date.strftime('%Y-%m-%d'),
+                'timeZone': 'America/New_York',
+            },
+            'reminders': {
+                'useDefault': False,
+                'overrides': [
+                    {'method': 'popup', 'minutes': 1440},  # 1 day before
+                    {'method': 'popup', 'minutes': 60},  # 1 hour before
+                ],
+            }
+        }
+        calendar_id = user_email  # Use user's email as calendar ID
+        event = service.events().insert(calendarId=calendar_id, body=event).execute()
+        return True, f"Added to calendar!"
+    except Exception as e:
+        return False, f"Error: {str(e)}"
+
+def send_email_alert(to_email, subject, body):
+    try:
+        from_email = st.secrets.get("alert_email", "")
+        password = st.secrets.get("alert_email_password", "")
+        if not from_email or not password:
+            return False, "Email credentials not configured"
+        msg = MIMEMultipart()
+        msg['From'] = from_email
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'html'))
+        server = smtplib.SMTP('smtp.gmail.com', 587)
+        server.starttls()
+        server.login(from_email, password)
+        server.send_message(msg)
+        server.quit()
+        return True, "Email sent successfully!"
+    except Exception as e:
+        return False, f"Error sending email: {str(e)}"
+
+def check_upcoming_airdrops(airdrops, days_ahead=7):
+    upcoming = []
+    today = date.today()
+    for airdrop in airdrops:
+        if airdrop.get('Expected Date') and airdrop.get('Status') == 'Active':
+            try:
+                expected = datetime.strptime(airdrop['Expected Date'], '%Y-%m-%d').date()
+                days_until = (expected - today).days
+                if 0 <= days_until <= days_ahead:
+                    airdrop['days_until'] = days_until
+                    upcoming.append(airdrop)
+            except:
+                continue
+    return upcoming
+
+def generate_alert_email(upcoming_airdrops):
+    html = """
+    <html>
+    <body style="font-family: Arial, sans-serif;">
+        <h2 style="color: #667eea;">🪂 Airdrop Alert!</h2>
+        <p>You have upcoming airdrops ready to claim:</p>
+        <table style="border-collapse: collapse; width: 100%;">
+            <tr style="background-color: #667eea; color: white;">
+                <th style="padding: 10px; text-align: left;">Protocol</th>
+                <th style="padding: 10px; text-align: left;">Expected Date</th>
+                <th style="padding: 10px; text-align: left;">Days Until</th>
+                <th style="padding: 10px; text-align: left;">Ref Link</th>
+            </tr>
+    """
+    for airdrop in upcoming_airdrops:
+        status_color = "#4CAF50" if airdrop['days_until'] == 0 else "#FF9800"
+        days_text = "TODAY!" if airdrop['days_until'] == 0 else f"{airdrop['days_until']} days"
+        html += f"""
+            <tr style="border-bottom: 1px solid #ddd;">
+                <td style="padding: 10px;">{airdrop.get('Protocol Name', 'N/A')}</td>
+                <td style="padding: 10px;">{airdrop.get('Expected Date', 'N/A')}</td>
+                <td style="padding: 10px; color: {status_color}; font-weight: bold;">{days_text}</td>
+                <td style="padding: 10px;"><a href="{airdrop.get('Ref Link', '#')}">Claim Now</a></td>
+            </tr>
+        """
+    html += """
+        </table>
+    </body>
+    </html>
+    """
+    return html
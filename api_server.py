@@ -0,0 +1,373 @@
+"""Headless JSON API for reading and writing portfolios.
+
+Runs next to the Streamlit app against the same sheet and secrets:
+
+    python api_server.py --port 8600
+
+Clients authenticate with `Authorization: Bearer <token>`; tokens map to the
+email address a user logs into the app with, in .streamlit/secrets.toml:
+
+    [api_tokens]
+    "token-for-alice" = "alice@example.com"
+
+Endpoints:
+    GET    /airdrops?status=&offset=&limit=   paginated portfolio listing
+    GET    /airdrops/upcoming?days=7          active airdrops due within N days
+    POST   /airdrops                          bulk upsert by Protocol Name
+    DELETE /airdrops?protocol=A&protocol=B    bulk delete by Protocol Name
+
+Every GET response carries an ETag; pollers that send it back in
+If-None-Match get an empty 304 while nothing changed. Portfolios are cached
+for `api_cache_seconds` (default 10), so such polls don't touch the sheet at
+all. Writes accept If-Match for optimistic concurrency and always map to a
+single save_user_data call, however many entries they carry.
+
+GET tags have the form "<portfolio version>-<view>" and write responses
+return the bare "<portfolio version>". If-Match takes either: a write is
+allowed while the portfolio is still at the version the tag was read from.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import threading
+import time
+import traceback
+from datetime import date, datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import streamlit as st
+
+from airdrop_backend import generate_user_id, read_user_data, save_user_data, check_upcoming_airdrops
+
+STATUSES = ["Active", "Upcoming", "Completed"]
+DATE_FIELDS = ['Expected Date', 'Last Activity']
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def portfolio_etag(airdrops):
+    """Strong validator for a whole portfolio, its version"""
+    payload = json.dumps(airdrops, sort_keys=True, default=str)
+    return '"' + hashlib.sha256(payload.encode()).hexdigest()[:32] + '"'
+
+
+def view_etag(version, *parts):
+    """Validator for one view of a portfolio, prefixed with the portfolio version"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return f'"{version.strip(chr(34))}-{hashlib.sha256(payload.encode()).hexdigest()[:16]}"'
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    # Weak comparison as required for If-None-Match
+    candidates = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+    return etag in candidates
+
+
+def version_matches(header, version):
+    """If-Match check for writes: strong comparison of the portfolio version a tag carries"""
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    for tag in (tag.strip() for tag in header.split(',')):
+        # Weak tags never satisfy If-Match
+        if len(tag) > 2 and tag[0] == tag[-1] == '"':
+            if tag[1:-1].partition('-')[0] == version.strip('"'):
+                return True
+    return False
+
+
+def normalize_airdrop(item, existing=None):
+    """Merge a client-supplied entry into the shape the app stores"""
+    if not isinstance(item, dict):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Each entry must be a JSON object")
+    airdrop = dict(existing) if existing else {
+        'Protocol Name': '',
+        'Status': 'Active',
+        'Expected Date': '',
+        'Ref Link': '',
+        'Tasks Completed': '',
+        'Wallet Used': '',
+        'TX Count': 0,
+        'Amount Invested': '',
+        'Last Activity': '',
+        'Notes': ''
+    }
+    unknown = set(item) - set(airdrop)
+    if unknown:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Unknown fields: {', '.join(sorted(unknown))}")
+    airdrop.update(item)
+    airdrop['Protocol Name'] = str(airdrop['Protocol Name']).strip()
+    if not airdrop['Protocol Name']:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Protocol Name is required")
+    if airdrop['Status'] not in STATUSES:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Status must be one of {', '.join(STATUSES)}")
+    for field in DATE_FIELDS:
+        if airdrop[field]:
+            try:
+                datetime.strptime(str(airdrop[field]), '%Y-%m-%d')
+            except ValueError:
+                raise ApiError(HTTPStatus.BAD_REQUEST, f"{field} must be formatted YYYY-MM-DD")
+    try:
+        airdrop['TX Count'] = int(airdrop['TX Count'] or 0)
+    except (TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "TX Count must be an integer")
+    for field, value in airdrop.items():
+        if field != 'TX Count':
+            airdrop[field] = str(value)
+    return airdrop
+
+
+def _stored_form(airdrop):
+    # save_user_data writes every field with str(), so compare entries the same way
+    return {field: str(value) for field, value in airdrop.items()}
+
+
+class PortfolioStore:
+    """Per-user portfolio cache in front of the sheet.
+
+    Reads within `ttl` seconds of the last load are answered from memory.
+    Writes go through one lock because save_user_data rewrites the whole
+    sheet and concurrent read-modify-write cycles would drop entries.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.cache = {}
+
+    def get(self, user_id, fresh=False):
+        with self.lock:
+            cached = self.cache.get(user_id)
+        if cached and not fresh and time.monotonic() - cached[0] < self.ttl:
+            return cached[1], cached[2]
+        try:
+            airdrops = read_user_data(user_id)
+        except Exception:
+            # A failed read is never cached, and write() never saves over it
+            raise ApiError(HTTPStatus.BAD_GATEWAY, "Could not read from Google Sheets")
+        return self._remember(user_id, airdrops)
+
+    def _remember(self, user_id, airdrops):
+        etag = portfolio_etag(airdrops)
+        with self.lock:
+            self.cache[user_id] = (time.monotonic(), airdrops, etag)
+        return airdrops, etag
+
+    def write(self, user_id, if_match, change):
+        """Apply `change` to a freshly loaded portfolio and save it in one storage write.
+
+        `change` returns (result, changed); nothing is saved when it reports no change.
+        """
+        with self.write_lock:
+            airdrops, etag = self.get(user_id, fresh=True)
+            if if_match and not version_matches(if_match, etag):
+                raise ApiError(HTTPStatus.PRECONDITION_FAILED, "Portfolio changed since it was read")
+            updated = [dict(airdrop) for airdrop in airdrops]
+            result, changed = change(updated)
+            if not changed:
+                return result, etag
+            if not save_user_data(user_id, updated):
+                raise ApiError(HTTPStatus.BAD_GATEWAY, "Could not save to Google Sheets")
+            _, etag = self._remember(user_id, updated)
+            return result, etag
+
+
+def resolve_user(authorization, tokens):
+    scheme, _, token = (authorization or '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        raise ApiError(HTTPStatus.UNAUTHORIZED, "Missing bearer token")
+    for known_token, email in tokens.items():
+        if hmac.compare_digest(token.strip().encode(), str(known_token).encode()):
+            return generate_user_id(email)
+    raise ApiError(HTTPStatus.UNAUTHORIZED, "Invalid token")
+
+
+def _int_param(query, name, default, minimum, maximum):
+    try:
+        value = int(query.get(name, [default])[0])
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+    return max(minimum, min(value, maximum))
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "AirdropTrackerAPI/1.0"
+    store = None
+    tokens = {}
+
+    def do_GET(self):
+        self._handle(self._get)
+
+    def do_POST(self):
+        self._handle(self._post)
+
+    def do_DELETE(self):
+        self._handle(self._delete)
+
+    def _handle(self, route):
+        try:
+            url = urlsplit(self.path)
+            user_id = resolve_user(self.headers.get('Authorization'), self.tokens)
+            route(user_id, url.path.rstrip('/'), parse_qs(url.query))
+        except ApiError as e:
+            self._send_json(e.status, {'error': e.message})
+        except Exception:
+            # Details stay in the server log, not in the response
+            self.log_error("Unhandled error for %s %s", self.command, self.path)
+            traceback.print_exc()
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "Internal server error"})
+
+    def _get(self, user_id, path, query):
+        airdrops, version = self.store.get(user_id)
+        if path == '/airdrops':
+            status = query.get('status', [''])[0]
+            offset = _int_param(query, 'offset', 0, 0, len(airdrops))
+            limit = _int_param(query, 'limit', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+            etag = view_etag(version, 'list', status, offset, limit)
+            if self._not_modified(etag):
+                return
+            matching = [a for a in airdrops if not status or a.get('Status') == status]
+            page = matching[offset:offset + limit]
+            next_offset = offset + limit if offset + limit < len(matching) else None
+            self._send_json(HTTPStatus.OK, {
+                'items': page,
+                'total': len(matching),
+                'offset': offset,
+                'limit': limit,
+                'next_offset': next_offset
+            }, etag)
+        elif path == '/airdrops/upcoming':
+            days = _int_param(query, 'days', 7, 0, 365)
+            # The result moves with the calendar, not only with the data
+            etag = view_etag(version, 'upcoming', days, date.today().isoformat())
+            if self._not_modified(etag):
+                return
+            upcoming = check_upcoming_airdrops([dict(a) for a in airdrops], days)
+            self._send_json(HTTPStatus.OK, {'items': upcoming, 'total': len(upcoming)}, etag)
+        else:
+            raise ApiError(HTTPStatus.NOT_FOUND, "Not found")
+
+    def _post(self, user_id, path, query):
+        if path != '/airdrops':
+            raise ApiError(HTTPStatus.NOT_FOUND, "Not found")
+        body = self._read_json()
+        items = body.get('items') if isinstance(body, dict) else body
+        if not isinstance(items, list) or not items:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Expected a non-empty list of entries")
+
+        def upsert(airdrops):
+            by_name = {a.get('Protocol Name'): i for i, a in enumerate(airdrops)}
+            created = updated = unchanged = 0
+            for item in items:
+                name = str(item.get('Protocol Name', '')).strip() if isinstance(item, dict) else ''
+                if name in by_name:
+                    merged = normalize_airdrop(item, airdrops[by_name[name]])
+                    if _stored_form(merged) == _stored_form(airdrops[by_name[name]]):
+                        unchanged += 1
+                        continue
+                    airdrops[by_name[name]] = merged
+                    updated += 1
+                else:
+                    airdrops.append(normalize_airdrop(item))
+                    by_name[name] = len(airdrops) - 1
+                    created += 1
+            result = {'created': created, 'updated': updated, 'unchanged': unchanged, 'total': len(airdrops)}
+            return result, created + updated > 0
+
+        result, etag = self.store.write(user_id, self.headers.get('If-Match'), upsert)
+        self._send_json(HTTPStatus.OK, result, etag)
+
+    def _delete(self, user_id, path, query):
+        if path != '/airdrops':
+            raise ApiError(HTTPStatus.NOT_FOUND, "Not found")
+        names = set(query.get('protocol', []))
+        if not names:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Pass one or more protocol= parameters")
+
+        def delete(airdrops):
+            kept = [a for a in airdrops if a.get('Protocol Name') not in names]
+            deleted = len(airdrops) - len(kept)
+            airdrops[:] = kept
+            return {'deleted': deleted, 'total': len(kept)}, deleted > 0
+
+        result, etag = self.store.write(user_id, self.headers.get('If-Match'), delete)
+        self._send_json(HTTPStatus.OK, result, etag)
+
+    def _read_json(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        try:
+            return json.loads(self.rfile.read(length) or b'null')
+        except ValueError:
+            # Covers JSONDecodeError and bodies that aren't valid UTF-8
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Body must be valid JSON")
+
+    def _not_modified(self, etag):
+        if not etag_matches(self.headers.get('If-None-Match'), etag):
+            return False
+        self.send_response(HTTPStatus.NOT_MODIFIED)
+        self.send_header('ETag', etag)
+        self.end_headers()
+        return True
+
+    def _send_json(self, status, payload, etag=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'private, no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(host, port, tokens, cache_seconds):
+    handler = type('ConfiguredApiHandler', (ApiHandler,), {
+        'store': PortfolioStore(cache_seconds),
+        'tokens': dict(tokens),
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the airdrop portfolio JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args()
+
+    tokens = st.secrets.get("api_tokens", {})
+    if not tokens:
+        raise SystemExit("No api_tokens configured in .streamlit/secrets.toml")
+    server = make_server(args.host, args.port, tokens, float(st.secrets.get("api_cache_seconds", 10)))
+    print(f"Serving airdrop tracker API on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+"""Concurrent-session load test for the Streamlit app.
+
+Drives N simulated users through login, add, edit, alert and delete flows
+with streamlit.testing.v1.AppTest. Google Sheets, Google Calendar and SMTP
+are replaced by in-memory fakes, optionally with a simulated round-trip
+latency, so the numbers reflect the app's own rerun cost plus how many
+blocking backend calls, and how many sheet rows, each user action turns
+into. Every action checks the session state afterwards and aborts the run
+if it did not take effect.
+
+AppTest swaps process-wide state (the runtime instance, st.secrets) on every
+run, so the sessions of one process are interleaved action by action rather
+than threaded. They all share one fake backend, exactly like real users
+share one sheet. Use --processes to run several such groups in parallel,
+each with its own backend.
+
+AppTest executes every interaction as a full script run, including clicks
+inside st.fragment sections, so latencies for fragment interactions are an
+upper bound of what a browser session sees.
+
+Example:
+    python load_test.py --sessions 20 --adds 3 --sheets-latency 0.05
+"""
+import argparse
+import json
+import re
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from email import message_from_string
+from email.header import decode_header, make_header
+
+import airdrop_backend
+
+APP_SCRIPT = "airdrop_tracker.py"
+ACTIONS = ['login', 'add', 'edit', 'alert', 'delete']
+
+
+class BackendStats:
+    """Counters shared by all fakes of one process.
+
+    Names starting with `rows.` count sheet rows moved, everything else
+    counts backend calls.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+
+    def record(self, name, amount=1):
+        with self.lock:
+            self.counts[name] += amount
+
+    def snapshot(self):
+        with self.lock:
+            return Counter(self.counts)
+
+
+class _Request:
+    """Mimics the googleapiclient request object: work happens on execute()"""
+
+    def __init__(self, func, latency):
+        self.func = func
+        self.latency = latency
+
+    def execute(self):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.func()
+
+
+def _column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def _parse_range(a1_range):
+    """Split 'Sheet!A2:K10' into (sheet, first_row, last_row, first_col, last_col), rows 0-based"""
+    sheet, _, cells = a1_range.partition('!')
+    bounds = []
+    for part in cells.split(':'):
+        match = re.fullmatch(r'([A-Z]+)(\d*)', part)
+        bounds.append((_column_index(match.group(1)), int(match.group(2)) - 1 if match.group(2) else None))
+    (first_col, first_row), (last_col, last_row) = bounds[0], bounds[-1]
+    if len(bounds) == 1:
+        last_row = None
+    return sheet, first_row or 0, last_row, first_col, last_col
+
+
+class FakeSheetsService:
+    """In-memory stand-in for the Sheets v4 values API used by airdrop_backend"""
+
+    def __init__(self, stats, latency=0.0):
+        self.stats = stats
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.sheets = defaultdict(list)
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId, range):
+        self.stats.record('sheets.get')
+        return _Request(lambda: self._get(range), self.latency)
+
+    def update(self, spreadsheetId, range, valueInputOption, body):
+        self.stats.record('sheets.update')
+        return _Request(lambda: self._write(range, body['values']), self.latency)
+
+    def batchUpdate(self, spreadsheetId, body):
+        self.stats.record('sheets.batchUpdate')
+
+        def write_all():
+            for data in body['data']:
+                self._write(data['range'], data['values'])
+            return {}
+        return _Request(write_all, self.latency)
+
+    def clear(self, spreadsheetId, range):
+        self.stats.record('sheets.clear')
+        return _Request(lambda: self._clear(range), self.latency)
+
+    def _get(self, a1_range):
+        sheet, first_row, last_row, first_col, last_col = _parse_range(a1_range)
+        with self.lock:
+            rows = self.sheets[sheet][first_row:None if last_row is None else last_row + 1]
+            values = [list(row[first_col:last_col + 1]) for row in rows]
+        # The real API omits trailing empty cells and rows
+        for row in values:
+            while row and row[-1] == '':
+                row.pop()
+        while values and not values[-1]:
+            values.pop()
+        self.stats.record('rows.read', len(values))
+        return {'values': values} if values else {}
+
+    def _write(self, a1_range, values):
+        sheet, first_row, _, first_col, _ = _parse_range(a1_range)
+        with self.lock:
+            grid = self.sheets[sheet]
+            for offset, row in enumerate(values):
+                while len(grid) <= first_row + offset:
+                    grid.append([])
+                target = grid[first_row + offset]
+                if len(target) < first_col + len(row):
+                    target.extend([''] * (first_col + len(row) - len(target)))
+                target[first_col:first_col + len(row)] = [str(value) for value in row]
+        self.stats.record('rows.written', len(values))
+        return {}
+
+    def _clear(self, a1_range):
+        sheet, first_row, last_row, first_col, last_col = _parse_range(a1_range)
+        with self.lock:
+            grid = self.sheets[sheet]
+            for row in grid[first_row:None if last_row is None else last_row + 1]:
+                for col in range(first_col, min(last_col + 1, len(row))):
+                    row[col] = ''
+        return {}
+
+
+class FakeCalendarService:
+    def __init__(self, stats, latency=0.0):
+        self.stats = stats
+        self.latency = latency
+        self.inserted = []
+
+    def events(self):
+        return self
+
+    def insert(self, calendarId, body):
+        self.stats.record('calendar.insert')
+
+        def insert_event():
+            self.inserted.append((calendarId, body))
+            return {'id': str(len(self.inserted))}
+        return _Request(insert_event, self.latency)
+
+
+def make_fake_smtp(stats, latency=0.0):
+    """Build an smtplib.SMTP replacement that keeps sent messages in memory"""
+
+    class FakeSMTP:
+        outbox = []
+
+        def __init__(self, host, port):
+            stats.record('smtp.connect')
+            if latency:
+                time.sleep(latency)
+
+        def starttls(self):
+            pass
+
+        def login(self, user, password):
+            pass
+
+        def send_message(self, msg):
+            stats.record('smtp.send')
+            if latency:
+                time.sleep(latency)
+            FakeSMTP.outbox.append(message_from_string(msg.as_string()))
+
+        def quit(self):
+            pass
+
+        @classmethod
+        def last_code_for(cls, email):
+            for msg in reversed(cls.outbox):
+                if msg['To'] == email and 'Verification Code' in msg['Subject']:
+                    body = msg.get_payload()[0].get_payload(decode=True).decode()
+                    return re.search(r'>\s*(\d{6})\s*<', body).group(1)
+            return None
+
+    return FakeSMTP
+
+
+def install_fake_backend(sheets_latency=0.0, calendar_latency=0.0, smtp_latency=0.0):
+    """Route airdrop_backend's Google and SMTP clients to in-memory fakes"""
+    stats = BackendStats()
+    sheets = FakeSheetsService(stats, sheets_latency)
+    calendar = FakeCalendarService(stats, calendar_latency)
+    smtp = make_fake_smtp(stats, smtp_latency)
+    airdrop_backend.get_sheets_service = lambda: sheets
+    airdrop_backend.get_calendar_service = lambda: calendar
+    airdrop_backend.smtplib.SMTP = smtp
+    return stats, smtp
+
+
+def _widget(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+class SimulatedUser:
+    """One browser session, advanced one user action at a time"""
+
+    def __init__(self, index, smtp, stats, adds, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.email = f"loadtest{index}@example.com"
+        self.smtp = smtp
+        self.stats = stats
+        self.adds = adds
+        self.at = AppTest.from_file(APP_SCRIPT, default_timeout=timeout)
+        self.at.secrets.update({
+            'sheet_id': 'load-test',
+            'alert_email': 'alerts@example.com',
+            'alert_email_password': 'load-test',
+            'encryption_key': 'load-test-key',
+        })
+        self.samples = []
+
+    def _run(self, action, interact=None):
+        """Apply one widget interaction and time the resulting script run"""
+        if interact:
+            interact(self.at)
+        started = time.perf_counter()
+        self.at.run()
+        elapsed = time.perf_counter() - started
+        if self.at.exception:
+            raise RuntimeError(f"{self.email} {action}: {self.at.exception[0].message}")
+        return elapsed
+
+    def _action(self, action, *steps, expect=None):
+        """Run the steps of one user action, then check it had the intended effect"""
+        before = self.stats.snapshot()
+        latencies = [self._run(action, step) for step in steps]
+        calls = self.stats.snapshot()
+        calls.subtract(before)
+        # A flow that silently stopped working would otherwise just look fast
+        if expect and not expect(self.at.session_state):
+            raise RuntimeError(f"{self.email} {action}: the action did not take effect")
+        self.samples.append({'action': action, 'latencies': latencies, 'calls': dict(+calls)})
+
+    def _protocols(self):
+        return [airdrop['Protocol Name'] for airdrop in self.at.session_state.airdrops]
+
+    def _alerts_sent(self):
+        return sum(1 for msg in self.smtp.outbox
+                   if msg['To'] == self.email and 'Airdrop Alert' in str(make_header(decode_header(msg['Subject']))))
+
+    def login(self):
+        self._action(
+            'login',
+            None,
+            lambda at: (_widget(at.text_input, "📧 Email Address").input(self.email),
+                        _widget(at.button, "Send Verification Code").click()),
+            lambda at: _widget(at.text_input, "Enter 6-digit code").input(self.smtp.last_code_for(self.email)),
+            lambda at: _widget(at.button, "Verify").click(),
+            expect=lambda state: state.authenticated and state.user_email == self.email,
+        )
+
+    def add(self, n):
+        name = f"Protocol {n}"
+        count = len(self.at.session_state.airdrops)
+
+        def fill(at):
+            _widget(at.text_input, "Protocol Name*").input(name)
+            _widget(at.text_input, "Amount Invested (e.g., $500)").input(f"${(n + 1) * 100}")
+            [w for w in at.date_input if w.label == "Expected Date"][-1].set_value(date.today() + timedelta(days=n + 1))
+            _widget(at.checkbox, "📅 Add to Google Calendar").check()
+            _widget(at.button, "Add Protocol").click()
+        self._action('add', fill,
+                     expect=lambda state: len(state.airdrops) == count + 1 and name in self._protocols())
+
+    def edit(self):
+        def save(at):
+            _widget(at.number_input, "TX Count").set_value(7)
+            _widget(at.button, "💾 Save Changes").click()
+        self._action('edit', lambda at: at.button(key="edit_0").click(), save,
+                     expect=lambda state: state.airdrops[0]['TX Count'] == 7 and not state['editing_0'])
+
+    def alert(self):
+        sent = self._alerts_sent()
+        self._action(
+            'alert',
+            lambda at: _widget(at.slider, "Alert me X days before").set_value(14),
+            lambda at: _widget(at.button, "🔍 Check Alerts Now").click(),
+            expect=lambda state: self._alerts_sent() == sent + 1,
+        )
+
+    def delete(self):
+        deleted = self._protocols()[0]
+        count = len(self.at.session_state.airdrops)
+        self._action('delete', lambda at: at.button(key="delete_0").click(),
+                     expect=lambda state: len(state.airdrops) == count - 1 and deleted not in self._protocols())
+
+    def script(self):
+        """The scenario as a generator: each next() performs one user action"""
+        self.login()
+        yield
+        for n in range(self.adds):
+            self.add(n)
+            yield
+        self.edit()
+        yield
+        self.alert()
+        yield
+        self.delete()
+        yield
+
+
+def run_group(first_index, sessions, adds, sheets_latency, calendar_latency, smtp_latency, timeout):
+    """Interleave `sessions` users against one fake backend; returns raw samples"""
+    stats, smtp = install_fake_backend(sheets_latency, calendar_latency, smtp_latency)
+    users = [SimulatedUser(first_index + i, smtp, stats, adds, timeout) for i in range(sessions)]
+    scripts = [user.script() for user in users]
+    started = time.perf_counter()
+    while scripts:
+        for script in list(scripts):
+            try:
+                next(script)
+            except StopIteration:
+                scripts.remove(script)
+    elapsed = time.perf_counter() - started
+    return {'elapsed': elapsed, 'samples': [sample for user in users for sample in user.samples]}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(groups, sessions):
+    samples = [sample for group in groups for sample in group['samples']]
+    wall = max(group['elapsed'] for group in groups)
+    by_action = defaultdict(list)
+    for sample in samples:
+        by_action[sample['action']].append(sample)
+
+    def describe(entries):
+        latencies = [latency for entry in entries for latency in entry['latencies']]
+        calls = Counter()
+        for entry in entries:
+            calls.update(entry['calls'])
+        rows = {name: count for name, count in calls.items() if name.startswith('rows.')}
+        return {
+            'actions': len(entries),
+            'reruns': len(latencies),
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p90_ms': percentile(latencies, 90) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'max_ms': max(latencies, default=0) * 1000,
+            'mean_action_ms': statistics.fmean(sum(e['latencies']) for e in entries) * 1000 if entries else 0,
+            # Backend work caused by one user action, on average
+            'calls_per_action': {name: count / len(entries) for name, count in sorted(calls.items()) if name not in rows},
+            'rows_per_action': {name: count / len(entries) for name, count in sorted(rows.items())},
+        }
+
+    return {
+        'sessions': sessions,
+        'wall_seconds': wall,
+        'actions_per_second': len(samples) / wall if wall else 0,
+        'reruns_per_second': sum(len(s['latencies']) for s in samples) / wall if wall else 0,
+        'overall': describe(samples),
+        'by_action': {action: describe(by_action[action]) for action in ACTIONS if action in by_action},
+    }
+
+
+def print_report(report):
+    print(f"{report['sessions']} sessions in {report['wall_seconds']:.2f}s: "
+          f"{report['actions_per_second']:.1f} actions/s, {report['reruns_per_second']:.1f} reruns/s")
+    header = f"{'action':<8} {'n':>5} {'reruns':>6} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'rows r/w':>11}  backend calls per action"
+    print(header)
+    print('-' * len(header))
+    rows = list(report['by_action'].items()) + [('all', report['overall'])]
+    for action, stats in rows:
+        calls = ', '.join(f"{name}={count:.1f}" for name, count in stats['calls_per_action'].items())
+        rows = f"{stats['rows_per_action'].get('rows.read', 0):.1f}/{stats['rows_per_action'].get('rows.written', 0):.1f}"
+        print(f"{action:<8} {stats['actions']:>5} {stats['reruns']:>6} {stats['p50_ms']:>8.1f} {stats['p90_ms']:>8.1f} "
+              f"{stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f} {rows:>11}  {calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the airdrop tracker with simulated concurrent sessions")
+    parser.add_argument("--sessions", type=int, default=10, help="simulated users in total")
+    parser.add_argument("--processes", type=int, default=1, help="independent groups run in parallel, each with its own backend")
+    parser.add_argument("--adds", type=int, default=3, help="protocols each user adds")
+    parser.add_argument("--sheets-latency", type=float, default=0.0, help="seconds per Sheets API call")
+    parser.add_argument("--calendar-latency", type=float, default=0.0, help="seconds per Calendar API call")
+    parser.add_argument("--smtp-latency", type=float, default=0.0, help="seconds per SMTP connect and send")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds allowed for one script run")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    args = parser.parse_args()
+    # edit and delete work on the first entry, and alert needs the first add's date (tomorrow)
+    if args.adds < 1:
+        parser.error("--adds must be at least 1")
+    if args.sessions < 1:
+        parser.error("--sessions must be at least 1")
+
+    processes = max(1, min(args.processes, args.sessions))
+    group_sizes = [args.sessions // processes + (1 if i < args.sessions % processes else 0) for i in range(processes)]
+    group_args = []
+    first_index = 0
+    for size in group_sizes:
+        group_args.append((first_index, size, args.adds, args.sheets_latency,
+                           args.calendar_latency, args.smtp_latency, args.timeout))
+        first_index += size
+
+    if processes == 1:
+        groups = [run_group(*group_args[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            groups = list(pool.map(run_group, *zip(*group_args)))
+
+    report = summarize(groups, args.sessions)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""Re-encrypt every stored wallet address under the current encryption key.
+
+Rotation workflow:
+  1. In .streamlit/secrets.toml move the old `encryption_key` value into
+     `previous_encryption_keys` and set `encryption_key` to the new secret.
+     The app keeps reading old rows through MultiFernet, and every save it
+     makes already writes that user's wallets under the new key.
+  2. Stop the Streamlit app and api_server.py, then run
+     `python rotate_encryption_key.py --app-offline`. The sheet is streamed
+     in chunks, wallets are re-encrypted across a process pool and written
+     back with batched range updates. Progress is checkpointed, so an
+     interrupted run picks up where it stopped when started again.
+  3. Only when the tool reports that every wallet opens with the current key
+     alone, drop the old secret from `previous_encryption_keys` and start
+     the app again.
+
+The app must stay offline while this runs. A save clears and rewrites the
+whole sheet, and one landing between the tool's re-read of a chunk and its
+write would put one user's wallet into another user's row. The final
+verification pass can't notice that, because the misplaced token opens
+fine under the current key. The re-read only narrows that window: rows
+whose (User ID, Protocol Name, token) changed are skipped and counted as
+retries. A final pass over the whole sheet rotates anything still under an
+old key, for example rows above a stale checkpoint.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import streamlit as st
+from cryptography.fernet import InvalidToken
+
+from airdrop_backend import (
+    get_sheets_service,
+    get_encryption_secrets,
+    get_encryption_key,
+    is_encrypted_wallet,
+    rotate_wallet,
+)
+
+SHEET_NAME = "UserData"
+WALLET_COLUMN = "G"
+FIRST_DATA_ROW = 2
+CHECKPOINT_FILE = ".rotation_checkpoint.json"
+
+_worker_fernet = None
+
+
+def _init_worker(secrets):
+    global _worker_fernet
+    _worker_fernet = get_encryption_key(secrets)
+
+
+def _new_counts():
+    return {'empty': 0, 'rotated': 0, 'encrypted': 0, 'failed': 0}
+
+
+def rotate_entries(entries, fernet):
+    """Rotate the token of each (User ID, Protocol Name, token) entry"""
+    counts = _new_counts()
+    rotated_values = []
+    for _, _, token in entries:
+        status, new_value = rotate_wallet(token, fernet)
+        counts[status] += 1
+        rotated_values.append(new_value)
+    return rotated_values, counts
+
+
+def _rotate_chunk(start_row, entries):
+    rotated_values, counts = rotate_entries(entries, _worker_fernet)
+    return start_row, entries, rotated_values, counts
+
+
+def key_fingerprint(secrets):
+    """Short hash identifying the key set a checkpoint belongs to"""
+    return hashlib.sha256("\n".join(secrets).encode()).hexdigest()[:16]
+
+
+def load_checkpoint(path, sheet_id, fingerprint):
+    if not os.path.exists(path):
+        return FIRST_DATA_ROW
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('sheet_id') != sheet_id or checkpoint.get('key_fingerprint') != fingerprint:
+        # Left over from a rotation to a different key or sheet
+        return FIRST_DATA_ROW
+    return checkpoint.get('next_row', FIRST_DATA_ROW)
+
+
+def save_checkpoint(path, sheet_id, fingerprint, next_row):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'sheet_id': sheet_id, 'key_fingerprint': fingerprint, 'next_row': next_row}, f)
+    os.replace(tmp_path, path)
+
+
+def count_rows(service, sheet_id):
+    """Last used row, taken from the User ID column which every row has"""
+    result = service.spreadsheets().values().get(
+        spreadsheetId=sheet_id,
+        range=f"{SHEET_NAME}!A:A"
+    ).execute()
+    return len(result.get('values', []))
+
+
+def read_entries(service, sheet_id, start_row, end_row):
+    """(User ID, Protocol Name, stored wallet) for every row in the range"""
+    result = service.spreadsheets().values().get(
+        spreadsheetId=sheet_id,
+        range=f"{SHEET_NAME}!A{start_row}:{WALLET_COLUMN}{end_row}"
+    ).execute()
+    entries = [(
+        row[0] if len(row) > 0 else '',
+        row[1] if len(row) > 1 else '',
+        row[6] if len(row) > 6 else ''
+    ) for row in result.get('values', [])]
+    # The API drops trailing empty rows, pad back to one entry per row
+    return entries + [('', '', '')] * (end_row - start_row + 1 - len(entries))
+
+
+def write_rotated(service, sheet_id, chunks):
+    """Write rotated wallets back where the row still holds the entry they were read from.
+
+    `chunks` is a list of (start_row, entries, rotated_values). Each chunk is
+    re-read first; rows whose entry changed since (an app save moved or
+    rewrote them) are left alone. Returns the number of rows skipped that way.
+    The re-read and the write are not atomic, which is why the app has to
+    be offline during a rotation.
+    """
+    data = []
+    moved = 0
+    for start_row, entries, rotated_values in chunks:
+        current = read_entries(service, sheet_id, start_row, start_row + len(entries) - 1)
+        run_start, run_values = None, []
+        for offset, (entry, now, value) in enumerate(zip(entries, current, rotated_values)):
+            writable = entry == now and value != entry[2]
+            if entry != now:
+                moved += 1
+            if writable:
+                if run_start is None:
+                    run_start = start_row + offset
+                run_values.append([value])
+            if run_start is not None and (not writable or offset == len(entries) - 1):
+                data.append({
+                    'range': f"{SHEET_NAME}!{WALLET_COLUMN}{run_start}:{WALLET_COLUMN}{run_start + len(run_values) - 1}",
+                    'values': run_values
+                })
+                run_start, run_values = None, []
+    if data:
+        service.spreadsheets().values().batchUpdate(
+            spreadsheetId=sheet_id,
+            body={'valueInputOption': 'RAW', 'data': data}
+        ).execute()
+    return moved
+
+
+def opens_with(stored_wallet, fernet):
+    try:
+        fernet.decrypt(base64.urlsafe_b64decode(stored_wallet.encode()))
+        return True
+    except (InvalidToken, ValueError):
+        return False
+
+
+def find_unrotated(service, sheet_id, current_fernet, all_fernet, chunk_size):
+    """Scan the whole sheet for wallets the current key alone can't open.
+
+    Returns (stale, failed): stale rows as (row, entry) that a configured key
+    can still rotate, and the number of tokens no configured key opens.
+    """
+    stale = []
+    failed = 0
+    last_row = count_rows(service, sheet_id)
+    for start_row in range(FIRST_DATA_ROW, last_row + 1, chunk_size):
+        end_row = min(start_row + chunk_size - 1, last_row)
+        for offset, entry in enumerate(read_entries(service, sheet_id, start_row, end_row)):
+            token = entry[2]
+            if not token or (is_encrypted_wallet(token) and opens_with(token, current_fernet)):
+                continue
+            if is_encrypted_wallet(token) and not opens_with(token, all_fernet):
+                failed += 1
+                continue
+            stale.append((start_row + offset, entry))
+    return stale, failed
+
+
+def report_progress(done, total, started, counts, resumed_at=0):
+    elapsed = max(time.monotonic() - started, 1e-6)
+    # Rate is measured over this run only, not rows finished before a resume
+    rate = (done - resumed_at) / elapsed
+    eta = (total - done) / rate if rate else 0
+    pct = 100 * done / total if total else 100
+    sys.stderr.write(
+        f"\r{done}/{total} rows ({pct:.1f}%) | {rate:.0f} rows/s | ETA {eta:.0f}s | "
+        f"rotated {counts['rotated']}, encrypted {counts['encrypted']}, "
+        f"failed {counts['failed']}, retries {counts['retries']}"
+    )
+    sys.stderr.flush()
+
+
+def rotate(chunk_size=2000, batch_chunks=5, workers=None, checkpoint_path=CHECKPOINT_FILE,
+           dry_run=False, retry_rounds=3):
+    """Run the rotation; returns the counts, or None without a Sheets connection.
+
+    Besides the per-status counts the result holds `retries` (rows skipped
+    because they moved), `unrotated` (rows still under an old key after the
+    retry rounds) and `verified`, which is True only when every wallet in
+    the sheet opens with the current key alone.
+    """
+    service = get_sheets_service()
+    if not service:
+        return None
+    sheet_id = st.secrets["sheet_id"]
+    secrets = get_encryption_secrets()
+    fingerprint = key_fingerprint(secrets)
+
+    last_row = count_rows(service, sheet_id)
+    start_row = FIRST_DATA_ROW if dry_run else load_checkpoint(checkpoint_path, sheet_id, fingerprint)
+    total = max(last_row - FIRST_DATA_ROW + 1, 0)
+    done = max(start_row - FIRST_DATA_ROW, 0)
+    if done:
+        sys.stderr.write(f"Resuming from row {start_row}\n")
+
+    counts = _new_counts()
+    counts['retries'] = 0
+    started = time.monotonic()
+    resumed_at = done
+    workers = workers or os.cpu_count() or 1
+    pending = deque()
+    ready = []
+    next_read = start_row
+
+    def flush():
+        nonlocal done
+        if not ready:
+            return
+        if not dry_run:
+            counts['retries'] += write_rotated(service, sheet_id, ready)
+            next_row = ready[-1][0] + len(ready[-1][1])
+            save_checkpoint(checkpoint_path, sheet_id, fingerprint, next_row)
+        done += sum(len(entries) for _, entries, _ in ready)
+        ready.clear()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(secrets,)) as pool:
+        while next_read <= last_row or pending:
+            # Keep the pool busy while the main process does the (blocking) Sheets I/O
+            while next_read <= last_row and len(pending) < workers * 2:
+                end_row = min(next_read + chunk_size - 1, last_row)
+                entries = read_entries(service, sheet_id, next_read, end_row)
+                pending.append(pool.submit(_rotate_chunk, next_read, entries))
+                next_read = end_row + 1
+            # Results are consumed in row order so the checkpoint only ever covers written rows
+            chunk_start, entries, rotated_values, chunk_counts = pending.popleft().result()
+            for status, count in chunk_counts.items():
+                counts[status] += count
+            ready.append((chunk_start, entries, rotated_values))
+            if len(ready) >= batch_chunks:
+                flush()
+            processed = done + sum(len(entries) for _, entries, _ in ready)
+            report_progress(processed, total, started, counts, resumed_at)
+        flush()
+
+    report_progress(done, total, started, counts, resumed_at)
+    sys.stderr.write("\n")
+    if dry_run:
+        counts.update(unrotated=None, verified=False)
+        return counts
+
+    # Rows moved by app saves, or shifted above the checkpoint of an earlier
+    # run, are still under an old key. Find and rotate them until none are left.
+    current_fernet = get_encryption_key(secrets[:1])
+    all_fernet = get_encryption_key(secrets)
+    for attempt in range(retry_rounds + 1):
+        stale, failed = find_unrotated(service, sheet_id, current_fernet, all_fernet, chunk_size)
+        if not stale or attempt == retry_rounds:
+            break
+        sys.stderr.write(f"Verification found {len(stale)} row(s) still under an old key, rotating again\n")
+        chunks = []
+        for row, entry in stale:
+            rotated_values, _ = rotate_entries([entry], all_fernet)
+            chunks.append((row, [entry], rotated_values))
+        counts['retries'] += write_rotated(service, sheet_id, chunks)
+    counts['failed'] = failed
+    counts['unrotated'] = len(stale)
+    counts['verified'] = not stale and not failed
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-encrypt stored wallet addresses under the current encryption_key")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="rows read and re-encrypted per task")
+    parser.add_argument("--batch-chunks", type=int, default=5, help="chunks written per batchUpdate request")
+    parser.add_argument("--workers", type=int, default=None, help="re-encryption processes (default: CPU count)")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE, help="progress file used to resume")
+    parser.add_argument("--retry-rounds", type=int, default=3, help="verification passes that re-rotate moved rows")
+    parser.add_argument("--dry-run", action="store_true", help="re-encrypt in memory only and report counts")
+    parser.add_argument("--app-offline", action="store_true",
+                        help="confirm the Streamlit app and API server are stopped (required unless --dry-run)")
+    args = parser.parse_args()
+
+    if not args.dry_run and not args.app_offline:
+        sys.exit("Stop the Streamlit app and api_server.py first: a save during rotation can write one user's "
+                 "wallet into another user's row. Then run again with --app-offline.")
+    if not args.dry_run:
+        print("Rotating wallets; keep the app and API stopped until this finishes.")
+
+    counts = rotate(args.chunk_size, args.batch_chunks, args.workers, args.checkpoint, args.dry_run, args.retry_rounds)
+    if counts is None:
+        sys.exit("Could not connect to Google Sheets")
+    print(f"Rotated {counts['rotated']}, encrypted {counts['encrypted']} legacy plain-text, "
+          f"skipped {counts['empty']} empty, retried {counts['retries']} moved row(s)")
+    if args.dry_run:
+        return
+    if counts['verified']:
+        print("Every wallet opens with the current key alone; previous_encryption_keys can now be removed.")
+        return
+    if counts['failed']:
+        print(f"{counts['failed']} wallet(s) could not be decrypted with any configured key and were left unchanged. "
+              "Add the missing key to previous_encryption_keys and run again.", file=sys.stderr)
+    if counts['unrotated']:
+        print(f"{counts['unrotated']} wallet(s) are still under an old key because their rows kept moving. "
+              "Make sure the app and API are stopped, then run again.", file=sys.stderr)
+    sys.exit("Keep previous_encryption_keys until a run reports every wallet verified.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+from datetime import date
+
+import pytest
+
+from airdrop_analytics import PortfolioAnalytics, parse_amount
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("$1,200.50", 1200.5),
+    ("500 USDC", 500),
+    ("1.5k", 1500),
+    ("~$2M", 2_000_000),
+    ("10k USDC", 10_000),
+    ("$500.", 500),
+    ("USDT 500", 500),
+    ("1.5M usdc", 1_500_000),
+    ("500", 500),
+    ("-$100", -100),
+    ("$500 + $200", 700),
+    ("0.5 ETH ($1,200)", 1200),
+    (250, 250),
+    # Token quantities and other numbers aren't dollars
+    ("500 MATIC", None),
+    ("500MATIC", None),
+    ("100 Mantle", None),
+    ("10 KAITO", None),
+    ("2 mETH", None),
+    ("1.5kETH", None),
+    ("2 ETH", None),
+    ("3 months", None),
+    ("$100 or $200", None),
+    ("2 ETH + $100", None),
+    ("TBD", None),
+    (None, None),
+])
+def test_parse_amount(text, expected):
+    assert parse_amount(text) == expected
+
+
+def _airdrop(name, status="Active", amount="", tx=0, last_activity=""):
+    return {'Protocol Name': name, 'Status': status, 'Amount Invested': amount,
+            'TX Count': tx, 'Last Activity': last_activity}
+
+
+def _aggregates(analytics):
+    return {
+        'status_counts': dict(analytics.status_counts),
+        'tx_by_status': {k: v for k, v in analytics.tx_by_status.items() if v},
+        'invested_by_status': dict(analytics.invested_by_status),
+        'invested_by_protocol': dict(analytics.invested_by_protocol),
+        'invested_by_month': dict(analytics.invested_by_month),
+        'activity_dates': dict(analytics.activity_dates),
+        'unparsed_amounts': analytics.unparsed_amounts,
+        'rows': analytics.rows,
+    }
+
+
+def test_changes_match_a_rebuild():
+    airdrops = [
+        _airdrop("A", amount="$100", tx=3, last_activity="2026-09-01"),
+        _airdrop("B", status="Upcoming", amount="500 MATIC", tx=1, last_activity="2026-10-01"),
+        _airdrop("C", amount="TBD", tx=2),
+    ]
+    analytics = PortfolioAnalytics(airdrops)
+
+    airdrops.append(_airdrop("D", status="Completed", amount="1.5k", tx=4, last_activity="2026-10-10"))
+    analytics.add(airdrops[-1])
+    assert _aggregates(analytics) == _aggregates(PortfolioAnalytics(airdrops))
+
+    airdrops[1] = _airdrop("B", status="Completed", amount="$250", tx=5, last_activity="2026-10-12")
+    analytics.replace(1, airdrops[1])
+    assert _aggregates(analytics) == _aggregates(PortfolioAnalytics(airdrops))
+
+    airdrops.pop(2)
+    analytics.remove(2)
+    assert _aggregates(analytics) == _aggregates(PortfolioAnalytics(airdrops))
+
+    assert analytics.total == 3
+    assert analytics.total_tx == 12
+    assert analytics.total_invested == 1850
+    assert analytics.unparsed_amounts == 0
+    assert analytics.amounts() == [100, 250, 1500]
+
+
+def test_removing_everything_empties_the_aggregates():
+    airdrops = [_airdrop("A", amount="$100", tx=3, last_activity="2026-09-01"),
+                _airdrop("B", amount="abc")]
+    analytics = PortfolioAnalytics(airdrops)
+    analytics.remove(1)
+    analytics.remove(0)
+    assert analytics.total == 0
+    assert analytics.total_invested == 0
+    assert not analytics.invested_by_protocol
+    assert analytics.unparsed_amounts == 0
+    assert analytics.recency(date(2026, 10, 19)) == {'days_since_last': None, 'active_7d': 0, 'active_30d': 0}
@@ -0,0 +1,30 @@
+import pytest
+import streamlit as st
+
+import airdrop_backend
+from airdrop_backend import read_user_data, save_user_data
+from load_test import BackendStats, FakeSheetsService
+
+
+@pytest.fixture
+def sheets(monkeypatch):
+    sheets = FakeSheetsService(BackendStats())
+    monkeypatch.setattr(airdrop_backend, 'get_sheets_service', lambda: sheets)
+    return sheets
+
+
+def test_undecryptable_wallet_is_saved_unchanged(sheets, monkeypatch):
+    monkeypatch.setattr(st, 'secrets', {'sheet_id': 'test', 'encryption_key': 'old'})
+    save_user_data('u', [{'Protocol Name': 'A', 'Wallet Used': '0xabc'}])
+    token = sheets.sheets['UserData'][1][6]
+
+    # The old key was dropped before this wallet was rotated
+    monkeypatch.setattr(st, 'secrets', {'sheet_id': 'test', 'encryption_key': 'new'})
+    airdrops = read_user_data('u')
+    assert airdrops[0]['Wallet Used'] == token
+    save_user_data('u', airdrops)
+    assert sheets.sheets['UserData'][1][6] == token
+
+    monkeypatch.setattr(st, 'secrets', {'sheet_id': 'test', 'encryption_key': 'new',
+                                        'previous_encryption_keys': ['old']})
+    assert read_user_data('u')[0]['Wallet Used'] == '0xabc'
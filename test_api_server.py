@@ -0,0 +1,180 @@
+import http.client
+import json
+import threading
+
+import pytest
+import streamlit as st
+
+import airdrop_backend
+import api_server
+from api_server import ApiError, PortfolioStore, etag_matches, normalize_airdrop, version_matches
+from load_test import BackendStats, FakeSheetsService
+
+TOKEN = "test-token"
+
+
+@pytest.fixture
+def sheets(monkeypatch):
+    sheets = FakeSheetsService(BackendStats())
+    monkeypatch.setattr(airdrop_backend, 'get_sheets_service', lambda: sheets)
+    monkeypatch.setattr(st, 'secrets', {'sheet_id': 'test', 'encryption_key': 'test-key'})
+    return sheets
+
+
+@pytest.fixture
+def port(sheets):
+    server = api_server.make_server('127.0.0.1', 0, {TOKEN: 'alice@example.com'}, 60)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_port
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def request_api(port):
+    def request(method, path, body=None, headers=None):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        headers = {'Authorization': f'Bearer {TOKEN}', **(headers or {})}
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = conn.getresponse()
+        raw = response.read()
+        conn.close()
+        return response.status, response.getheader('ETag'), json.loads(raw) if raw else None
+
+    return request
+
+
+def test_get_then_304(request_api):
+    request_api('POST', '/airdrops', [{'Protocol Name': 'A'}])
+    status, etag, body = request_api('GET', '/airdrops')
+    assert status == 200 and body['total'] == 1
+    status, same, body = request_api('GET', '/airdrops', headers={'If-None-Match': etag})
+    assert (status, same, body) == (304, etag, None)
+    status, _, _ = request_api('GET', '/airdrops?status=Active', headers={'If-None-Match': etag})
+    assert status == 200
+
+
+def test_get_then_conditional_post(request_api):
+    request_api('POST', '/airdrops', [{'Protocol Name': 'A'}])
+    _, etag, _ = request_api('GET', '/airdrops')
+    status, write_etag, body = request_api('POST', '/airdrops', [{'Protocol Name': 'B'}], {'If-Match': etag})
+    assert status == 200 and body['created'] == 1
+    # The tag read before that write is stale now, the one it returned is not
+    status, _, _ = request_api('POST', '/airdrops', [{'Protocol Name': 'C'}], {'If-Match': etag})
+    assert status == 412
+    status, _, _ = request_api('DELETE', '/airdrops?protocol=B', headers={'If-Match': write_etag})
+    assert status == 200
+
+
+def test_weak_tag_fails_if_match(request_api):
+    request_api('POST', '/airdrops', [{'Protocol Name': 'A'}])
+    _, etag, _ = request_api('GET', '/airdrops')
+    status, _, _ = request_api('POST', '/airdrops', [{'Protocol Name': 'B'}], {'If-Match': 'W/' + etag})
+    assert status == 412
+
+
+def test_repeated_post_does_not_rewrite_the_sheet(request_api, sheets):
+    items = [{'Protocol Name': 'A', 'TX Count': 3, 'Wallet Used': '0xabc'}]
+    request_api('POST', '/airdrops', items)
+    clears = sheets.stats.counts['sheets.clear']
+    status, _, body = request_api('POST', '/airdrops', items)
+    assert status == 200
+    assert body == {'created': 0, 'updated': 0, 'unchanged': 1, 'total': 1}
+    assert sheets.stats.counts['sheets.clear'] == clears
+    status, _, body = request_api('POST', '/airdrops', [{'Protocol Name': 'A', 'TX Count': 4}])
+    assert body['updated'] == 1
+    assert sheets.stats.counts['sheets.clear'] == clears + 1
+
+
+def test_delete_matching_nothing_does_not_rewrite_the_sheet(request_api, sheets):
+    request_api('POST', '/airdrops', [{'Protocol Name': 'A'}])
+    clears = sheets.stats.counts['sheets.clear']
+    status, _, body = request_api('DELETE', '/airdrops?protocol=Z')
+    assert (status, body['deleted']) == (200, 0)
+    assert sheets.stats.counts['sheets.clear'] == clears
+
+
+@pytest.mark.parametrize("body, headers", [
+    (b'[]', {'Content-Length': 'abc'}),
+    (b'[]', {'Content-Length': '-1'}),
+    (b'["\x80"]', {'Content-Length': '5'}),
+    (b'{not json', {'Content-Length': '9'}),
+])
+def test_malformed_body_is_400(port, body, headers):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    conn.putrequest('POST', '/airdrops')
+    for name, value in {'Authorization': f'Bearer {TOKEN}', **headers}.items():
+        conn.putheader(name, value)
+    conn.endheaders(body)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    assert response.status == 400
+
+
+def test_etag_matches():
+    assert etag_matches('"a"', '"a"')
+    assert etag_matches('W/"a"', '"a"')
+    assert etag_matches('"b", "a"', '"a"')
+    assert etag_matches('*', '"a"')
+    assert not etag_matches('"b"', '"a"')
+    assert not etag_matches(None, '"a"')
+
+
+def test_version_matches():
+    assert version_matches('"v1"', '"v1"')
+    assert version_matches('"v1-view"', '"v1"')
+    assert version_matches('"x", "v1-view"', '"v1"')
+    assert version_matches('*', '"v1"')
+    assert not version_matches('W/"v1"', '"v1"')
+    assert not version_matches('"v2-view"', '"v1"')
+    assert not version_matches('v1', '"v1"')
+
+
+def test_normalize_airdrop_fills_defaults():
+    airdrop = normalize_airdrop({'Protocol Name': ' A ', 'TX Count': '2'})
+    assert airdrop['Protocol Name'] == 'A'
+    assert airdrop['Status'] == 'Active'
+    assert airdrop['TX Count'] == 2
+    assert airdrop['Notes'] == ''
+
+
+def test_normalize_airdrop_merges_into_existing():
+    existing = normalize_airdrop({'Protocol Name': 'A', 'Notes': 'keep'})
+    airdrop = normalize_airdrop({'Status': 'Completed'}, existing)
+    assert airdrop['Notes'] == 'keep' and airdrop['Status'] == 'Completed'
+
+
+@pytest.mark.parametrize("item", [
+    'A',
+    {'Protocol Name': ''},
+    {'Protocol Name': 'A', 'Colour': 'red'},
+    {'Protocol Name': 'A', 'Status': 'Done'},
+    {'Protocol Name': 'A', 'Expected Date': '19/10/2026'},
+    {'Protocol Name': 'A', 'TX Count': 'many'},
+])
+def test_normalize_airdrop_rejects(item):
+    with pytest.raises(ApiError) as error:
+        normalize_airdrop(item)
+    assert error.value.status == 400
+
+
+def test_store_serves_reads_from_cache(sheets):
+    store = PortfolioStore(ttl=60)
+    assert store.get('u') == store.get('u')
+    assert sheets.stats.counts['sheets.get'] == 1
+    store.get('u', fresh=True)
+    assert sheets.stats.counts['sheets.get'] == 2
+
+
+def test_store_never_caches_or_saves_over_a_failed_read(sheets, monkeypatch):
+    def fail(**kwargs):
+        raise TimeoutError("sheet unavailable")
+    monkeypatch.setattr(sheets, 'get', fail)
+    store = PortfolioStore(ttl=60)
+    with pytest.raises(ApiError) as error:
+        store.write('u', None, lambda airdrops: (airdrops.append({'Protocol Name': 'A'}), True))
+    assert error.value.status == 502
+    assert not store.cache
+    assert sheets.stats.counts['sheets.clear'] == 0